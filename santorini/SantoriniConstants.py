@@ -1,5 +1,13 @@
 import numpy as np
 
+try:
+    from numba import njit
+except ImportError:  # Pyodide ships without numba: run the same code as plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
 NO_MOVE = 4
 NO_BUILD = 4
 
@@ -7,6 +15,7 @@ NO_GOD = 0
 NB_GODS = 1
 
 
+@njit('UniTuple(int64, 4)(int64)', cache=True, inline='always')
 def _decode_action(action):
     worker, action_ = divmod(action, NB_GODS * 9 * 9)
     power, action_ = divmod(action_, 9 * 9)
@@ -14,6 +23,7 @@ def _decode_action(action):
     return worker, power, move_direction, build_direction
 
 
+@njit('int64(int64, int64, int64, int64)', cache=True, inline='always')
 def _encode_action(worker, power, move_direction, build_direction):
     action = NB_GODS * 9 * 9 * worker + 9 * 9 * power + 9 * move_direction + build_direction
     return action
@@ -38,3 +48,8 @@ flipLR = np.array(_generate_permutation(flipLR_core), dtype=np.int16)
 
 flipUD_core = np.array([6, 7, 8, 3, 4, 5, 0, 1, 2], dtype=np.int16)
 flipUD = np.array(_generate_permutation(flipUD_core), dtype=np.int16)
+
+# Gather form of the permutations above: array[rotation_inv] moves each array[i] to index rotation[i]
+rotation_inv = np.argsort(rotation)
+flipLR_inv = np.argsort(flipLR)
+flipUD_inv = np.argsort(flipUD)
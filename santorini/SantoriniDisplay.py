@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 import numpy as np
 try:
         from colorama import Style, Fore, Back
@@ -29,6 +31,16 @@ my_workers_color    = [Fore.WHITE, Fore.BLUE  , Fore.CYAN]
 other_workers_color = [Fore.WHITE, Fore.YELLOW, Fore.MAGENTA]
 levels_char = ['◎', '▂', '▅', '█', 'X']
 directions_char = ['↖', '↑', '↗', '←', 'Ø', '→', '↙', '↓', '↘']
+_RESET = Style.RESET_ALL
+
+def _format_cell(worker, level):
+        if worker == 0 and level == 0:
+                return '| '
+        worker_color = my_workers_color[worker] if worker >= 0 else other_workers_color[-worker]
+        return f'|{worker_color}{levels_char[level]}{_RESET}'
+
+# Fully formatted cell for each (worker, level) pair, so printing a row is a single join
+CELL_CACHE = {(worker, level): _format_cell(worker, level) for worker in range(-2, 3) for level in range(5)}
 
 # Global variable to store evaluation values
 _current_eval = None
@@ -63,16 +75,19 @@ def get_eval_bar(value, width=40):
         else:
                 color = Fore.RED
 
-        bar = color + '█' * filled + Style.DIM + '░' * empty + Style.RESET_ALL
+        bar = color + '█' * filled + Style.DIM + '░' * empty + _RESET
         percentage = int(normalized * 100)
 
         return f'[{bar}] {value:+.3f} ({percentage}%)'
 
+# Pure function of (move, player), at most 2 * action_size() distinct results: the history
+# snapshot and move lists ask for the same descriptions on every refresh
+@lru_cache(maxsize=1024)
 def move_to_str(move, player):
         worker, power, move_direction, build_direction = _decode_action(move)
         worker_color = my_workers_color[worker+1] if player == 0 else other_workers_color[worker+1]
         return (
-                f"Move {worker_color}worker {worker+1}{Style.RESET_ALL} to "
+                f"Move {worker_color}worker {worker+1}{_RESET} to "
                 f"{directions_char[move_direction]} and then build {directions_char[build_direction]}"
         )
 
@@ -80,47 +95,49 @@ def move_to_str(move, player):
 
 def _print_colors(board):
         message  = f'Player 0: '
-        message += f'{my_workers_color[1]}worker 1  {my_workers_color[2]}worker 2{Style.RESET_ALL} '
+        message += f'{my_workers_color[1]}worker 1  {my_workers_color[2]}worker 2{_RESET} '
         message += '(no god powers)    '
         message += f'Player 1: '
-        message += f'{other_workers_color[1]}worker 1  {other_workers_color[2]}worker 2{Style.RESET_ALL} '
+        message += f'{other_workers_color[1]}worker 1  {other_workers_color[2]}worker 2{_RESET} '
         message += '(no god powers)'
         print(message)
 
 def _print_main(board):
-        print(f'-'*11)
-        for y in range(5):
-                for x in range(5):
-                        worker, level = board.workers[y, x], board.levels[y, x]
-                        worker_color = my_workers_color[worker] if worker >= 0 else other_workers_color[-worker]
-                        if worker != 0 or level > 0:
-                                print(f'|{worker_color}{levels_char[level]}{Style.RESET_ALL}', end='')
-                        else:
-                                print(f'| ', end='')
-                print('|')
-                print(f'-'*11)
+        separator = '-'*11
+        print(separator)
+        for workers_row, levels_row in zip(board.workers.tolist(), board.levels.tolist()):
+                print(''.join([CELL_CACHE[cell] for cell in zip(workers_row, levels_row)]) + '|')
+                print(separator)
+
+@lru_cache(maxsize=64)
+def _render_eval_banner(player0_eval, player1_eval):
+        lines = [
+                '╔═══════════════════════════════════════════════════════════════════════════╗',
+                '║ AI EVALUATION                                                             ║',
+                '╠═══════════════════════════════════════════════════════════════════════════╣',
+                f'║ Player 0 (You):     {get_eval_bar(player0_eval, width=50)}    ║',
+        ]
+        if player1_eval is not None:
+                lines.append(f'║ Player 1 (Opponent): {get_eval_bar(player1_eval, width=50)}   ║')
+        lines.append('╚═══════════════════════════════════════════════════════════════════════════╝')
+        lines.append('')
+        return '\n'.join(lines)
 
 def print_board(board):
         global _current_eval
         print()
 
         if _current_eval is not None:
-                print('╔═══════════════════════════════════════════════════════════════════════════╗')
-                print('║ AI EVALUATION                                                             ║')
-                print('╠═══════════════════════════════════════════════════════════════════════════╣')
-
                 player0_eval = _current_eval[0] if isinstance(_current_eval, (list, np.ndarray)) else _current_eval
-
-                eval_str = get_eval_bar(player0_eval, width=50)
-                print(f'║ Player 0 (You):     {eval_str}    ║')
-
+                player1_eval = None
                 if isinstance(_current_eval, (list, np.ndarray)) and len(_current_eval) > 1:
                         player1_eval = _current_eval[1]
-                        eval_str = get_eval_bar(player1_eval, width=50)
-                        print(f'║ Player 1 (Opponent): {eval_str}   ║')
 
-                print('╚═══════════════════════════════════════════════════════════════════════════╝')
-                print()
+                # Quantize so repeated redraws of a near-identical evaluation hit the cache
+                print(_render_eval_banner(
+                        round(float(player0_eval), 3),
+                        None if player1_eval is None else round(float(player1_eval), 3),
+                ))
 
         _print_colors(board)
         _print_main(board)
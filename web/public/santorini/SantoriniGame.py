@@ -34,6 +34,11 @@ class SantoriniGame(Game):
         self.board.copy_state(board, False)
         return self.board.check_end_game(next_player)
 
+    def getGameEndedAndValidMoves(self, board, player):
+        # Same as (getGameEnded, getValidMoves) for the same player, generating moves only once
+        self.board.copy_state(board, False)
+        return self.board.end_and_valid_moves(player)
+
     def getScore(self, board, player):
         self.board.copy_state(board, False)
         return self.board.get_score(player)
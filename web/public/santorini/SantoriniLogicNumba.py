@@ -2,32 +2,84 @@ import numpy as np
 from SantoriniConstants import (
     NO_BUILD,
     NO_GOD,
-    NO_MOVE,
     NB_GODS,
     _decode_action,
     _encode_action,
-    flipLR,
-    flipUD,
-    rotation,
+    flipLR_inv,
+    flipUD_inv,
+    njit,
+    rotation_inv,
 )
 
 # 0: 2x2 workers set at an arbitrary position before 1st move
 # 1: 2x2 workers set at a random position before 1st move
 # 2: No worker pre-set, each player has to chose their position
 INIT_METHOD = 2
+# Compile-time constant so numba drops the placement-phase branches when workers are pre-set
+_PLACING_PHASE_POSSIBLE = INIT_METHOD == 2
+
+# (player, worker) to place next, in the order checked by Board._next_placement
+PLACEMENT_ORDER = ((0, 1), (0, 2), (1, -1), (1, -2))
+
+
+DIRECTIONS = np.array(
+    [
+        [-1, -1],
+        [-1, 0],
+        [-1, 1],
+        [0, -1],
+        [0, 0],
+        [0, 1],
+        [1, -1],
+        [1, 0],
+        [1, 1],
+    ],
+    dtype=np.int8,
+)
+
+
+def _generate_neighbors():
+    # NEIGHBORS[cell, direction] is the flat index of the neighbouring cell, or -1 if off-board
+    neighbors = np.full((25, 9), -1, dtype=np.int8)
+    for cell in range(25):
+        y, x = divmod(cell, 5)
+        for direction in range(9):
+            new_y, new_x = y + DIRECTIONS[direction, 0], x + DIRECTIONS[direction, 1]
+            if 0 <= new_y < 5 and 0 <= new_x < 5:
+                neighbors[cell, direction] = 5 * new_y + new_x
+    return neighbors
+
+
+NEIGHBORS = _generate_neighbors()
+
+
+def _generate_neighbor_masks():
+    # Bitboard of the (up to 8) cells surrounding each cell, bit i standing for flat cell i
+    masks = np.zeros(25, dtype=np.int64)
+    for cell in range(25):
+        for direction in range(9):
+            neighbor = NEIGHBORS[cell, direction]
+            if neighbor >= 0 and neighbor != cell:
+                masks[cell] |= 1 << int(neighbor)
+    return masks
+
+
+NEIGHBOR_MASKS = _generate_neighbor_masks()
+
+
+def _generate_cell_permutations():
+    cells = np.arange(25).reshape(5, 5)
+    transforms = [np.rot90(cells, k) for k in (1, 2, 3)] + [np.fliplr(cells), np.flipud(cells)]
+    return np.stack([transform.ravel() for transform in transforms]).astype(np.int8)
 
 
-DIRECTIONS = [
-    (-1, -1),
-    (-1, 0),
-    (-1, 1),
-    (0, -1),
-    (0, 0),
-    (0, 1),
-    (1, -1),
-    (1, 0),
-    (1, 1),
-]
+# SYM_PERMS[k] gathers a flattened plane into its symmetric image: new_plane = plane.ravel()[SYM_PERMS[k]]
+SYM_PERMS = _generate_cell_permutations()
+SYM_ROT90, SYM_FLIPLR, SYM_FLIPUD = 0, 3, 4  # rows 0-2 rotate by 1, 2 and 3 quarter turns
+
+# Relabelling tables indexed by worker + 2, swapping workers 1 <-> 2 (resp. -1 <-> -2)
+SWAP_MY_WORKERS = np.array([-2, -1, 0, 2, 1], dtype=np.int8)
+SWAP_OTHER_WORKERS = np.array([-1, -2, 0, 1, 2], dtype=np.int8)
 
 
 def observation_size():
@@ -39,22 +91,33 @@ def action_size():
     return NB_GODS * 2 * 9 * 9
 
 
+
+def _game_result(score0, score1, has_any_move, next_player):
+    if score0 == 3:
+        return np.array([1, -1], dtype=np.float32)
+    if score1 == 3:
+        return np.array([-1, 1], dtype=np.float32)
+    if not has_any_move:
+        if next_player == 0:
+            return np.array([-1, 1], dtype=np.float32)
+        else:
+            return np.array([1, -1], dtype=np.float32)
+    return np.array([0, 0], dtype=np.float32)
+
+
 class Board:
     def __init__(self, num_players):
-        self.state = np.zeros((5, 5, 3), dtype=np.int8)
+        # Plane-major storage (see copy_state): self.state is a (5, 5, 3) view of 3 contiguous planes
+        self.state = np.zeros((3, 5, 5), dtype=np.int8).transpose(1, 2, 0)
         self.workers = self.state[:, :, 0]
         self.levels = self.state[:, :, 1]
         self.meta = self.state[:, :, 2]
         self.init_game()
 
     def get_score(self, player):
-        highest_level = 0
-        comparator = (lambda w: w > 0) if player == 0 else (lambda w: w < 0)
-        for i in np.ndindex(5, 5):
-            worker, level = self.workers[i], self.levels[i]
-            if comparator(worker) and level > highest_level:
-                highest_level = level
-        return highest_level
+        # Highest level under one of the player's workers, 0 if none is placed
+        mask = self.workers > 0 if player == 0 else self.workers < 0
+        return int(np.where(mask, self.levels, 0).max())
 
     def init_game(self):
         self.state.fill(0)
@@ -74,89 +137,46 @@ class Board:
         return self.state
 
     def valid_moves(self, player):
-        actions = np.zeros(action_size(), dtype=np.bool_)
-        placement = None
-        if INIT_METHOD == 2:
-            placement = self._next_placement()
-            if placement is not None:
-                for index, value in np.ndenumerate(self.workers):
-                    actions[5 * index[0] + index[1]] = value == 0
-                return actions
-
-        for worker in range(2):
-            worker_id = (worker + 1) * (1 if player == 0 else -1)
-            worker_position = self._get_worker_position(worker_id)
-            if worker_position == (-1, -1):
-                continue
-            for move_direction in range(9):
-                if move_direction == NO_MOVE:
-                    continue
-                worker_new_position = self._apply_direction(worker_position, move_direction)
-                if not self._able_to_move_worker_to(worker_position, worker_new_position, player):
-                    continue
-                for build_direction in range(9):
-                    if build_direction == NO_BUILD:
-                        continue
-                    build_position = self._apply_direction(worker_new_position, build_direction)
-                    if not self._able_to_build(build_position, ignore=worker_id):
-                        continue
-                    actions[_encode_action(worker, NO_GOD, move_direction, build_direction)] = True
-        return actions
+        return _valid_moves(self.workers, self.levels, player)
 
     def make_move(self, move, player, deterministic):
-        placement = None
-        if INIT_METHOD == 2:
-            placement = self._next_placement()
-            if placement is not None:
-                placement_player, worker_to_place = placement
-                if placement_player != player:
-                    raise ValueError('Unexpected player attempting to place a worker')
-                y, x = divmod(move, 5)
-                if not (0 <= y < 5 and 0 <= x < 5):
-                    raise ValueError('Placement move is out of bounds')
-                if self.workers[y, x] != 0:
-                    raise ValueError('Cannot place a worker on an occupied tile')
-                self.workers[y, x] = worker_to_place
-                if worker_to_place in (1, -1):
-                    next_player = placement_player
-                else:
-                    next_player = 1 - placement_player
+        worker_cells = _get_worker_cells(self.workers.ravel())
+        placement = self._next_placement(worker_cells) if _PLACING_PHASE_POSSIBLE else None
+        if placement is not None:
+            placement_player, worker_to_place = placement
+            if placement_player != player:
+                raise ValueError('Unexpected player attempting to place a worker')
+            y, x = divmod(move, 5)
+            if not (0 <= y < 5 and 0 <= x < 5):
+                raise ValueError('Placement move is out of bounds')
+            if self.workers[y, x] != 0:
+                raise ValueError('Cannot place a worker on an occupied tile')
+            self.workers[y, x] = worker_to_place
+            if worker_to_place in (1, -1):
+                next_player = placement_player
             else:
-                placement = None
-        if INIT_METHOD != 2 or placement is None:
+                next_player = 1 - placement_player
+        else:
             worker, power, move_direction, build_direction = _decode_action(move)
             if power != NO_GOD:
                 raise ValueError('God powers are disabled in this build')
-            worker_id = (worker + 1) * (1 if player == 0 else -1)
-            worker_old_position = self._get_worker_position(worker_id)
-            worker_new_position = self._apply_direction(worker_old_position, move_direction)
-            old_level = self.levels[worker_old_position]
-            self.workers[worker_old_position], self.workers[worker_new_position] = 0, worker_id
-            if build_direction != NO_BUILD:
-                build_position = self._apply_direction(worker_new_position, build_direction)
-                self.levels[build_position] = min(4, self.levels[build_position] + 1)
-            new_level = self.levels[worker_new_position]
+            cell = worker_cells[worker if player == 0 else 2 + worker]
+            _move_worker(self.workers, self.levels, cell, move_direction, build_direction)
             next_player = 1 - player
-            if new_level >= 3 and new_level > old_level:
-                # keep round counter capped even if game ends immediately
-                pass
         if self.meta.flat[0] < 127:
             self.meta.flat[0] += 1
         return next_player
 
     def check_end_game(self, next_player):
-        if INIT_METHOD == 2 and self._next_placement() is not None:
-            return np.array([0, 0], dtype=np.float32)
-        if self.get_score(0) == 3:
-            return np.array([1, -1], dtype=np.float32)
-        if self.get_score(1) == 3:
-            return np.array([-1, 1], dtype=np.float32)
-        if self.valid_moves(next_player).sum() == 0:
-            if next_player == 0:
-                return np.array([-1, 1], dtype=np.float32)
-            else:
-                return np.array([1, -1], dtype=np.float32)
-        return np.array([0, 0], dtype=np.float32)
+        score0, score1, has_any_move = _terminal_status(self.workers, self.levels, next_player)
+        return _game_result(score0, score1, has_any_move, next_player)
+
+    # check_end_game and valid_moves for the same player, generating the moves only once
+    def end_and_valid_moves(self, next_player):
+        score0, score1, has_any_move, valid_actions = _terminal_status_and_valid_moves(
+            self.workers, self.levels, next_player
+        )
+        return _game_result(score0, score1, has_any_move, next_player), valid_actions
 
     def swap_players(self, nb_swaps):
         if nb_swaps != 1:
@@ -164,36 +184,36 @@ class Board:
         self.workers[:, :] = -self.workers
 
     def get_symmetries(self, policy, valid_actions):
-        symmetries = [(self.state.copy(), policy.copy(), valid_actions.copy())]
-        state_backup = self.state.copy()
+        symmetries, seen_states = [], set()
+        workers_flat, levels_flat = self.workers.ravel(), self.levels.ravel()
 
-        def _apply_permutation(permutation, array, array2):
-            array_copy, array2_copy = array.copy(), array2.copy()
-            for i, new_i in enumerate(permutation):
-                array_copy[new_i], array2_copy[new_i] = array[i], array2[i]
-            return array_copy, array2_copy
+        def _append(new_state, new_policy, new_actions):
+            # Symmetric positions (common early in the game) map onto themselves: keep one sample each
+            key = new_state.tobytes()
+            if key not in seen_states:
+                seen_states.add(key)
+                symmetries.append((new_state, new_policy, new_actions))
+
+        def _symmetric_state(new_workers_flat, new_levels_flat):
+            return np.stack([new_workers_flat.reshape(5, 5), new_levels_flat.reshape(5, 5), self.meta], axis=-1)
+
+        _append(self.state.copy(), policy.copy(), valid_actions.copy())
 
         rotated_policy, rotated_actions = policy, valid_actions
-        for _ in range(3):
-            self.workers[:, :] = np.rot90(self.workers)
-            self.levels[:, :] = np.rot90(self.levels)
-            rotated_policy, rotated_actions = _apply_permutation(rotation, rotated_policy, rotated_actions)
-            symmetries.append((self.state.copy(), rotated_policy.copy(), rotated_actions.copy()))
-        self.state[:, :, :] = state_backup.copy()
-
-        self.workers[:, :] = np.fliplr(self.workers)
-        self.levels[:, :] = np.fliplr(self.levels)
-        flipped_policy, flipped_actions = _apply_permutation(flipLR, policy, valid_actions)
-        symmetries.append((self.state.copy(), flipped_policy, flipped_actions))
-        self.state[:, :, :] = state_backup.copy()
-
-        self.workers[:, :] = np.flipud(self.workers)
-        self.levels[:, :] = np.flipud(self.levels)
-        flipped_policy, flipped_actions = _apply_permutation(flipUD, policy, valid_actions)
-        symmetries.append((self.state.copy(), flipped_policy, flipped_actions))
-        self.state[:, :, :] = state_backup.copy()
-
-        if INIT_METHOD == 2 and self._next_placement() is not None:
+        for k in range(3):
+            cells = SYM_PERMS[SYM_ROT90 + k]
+            rotated_policy, rotated_actions = rotated_policy[rotation_inv], rotated_actions[rotation_inv]
+            _append(_symmetric_state(workers_flat[cells], levels_flat[cells]), rotated_policy, rotated_actions)
+
+        cells = SYM_PERMS[SYM_FLIPLR]
+        flipped_policy, flipped_actions = policy[flipLR_inv], valid_actions[flipLR_inv]
+        _append(_symmetric_state(workers_flat[cells], levels_flat[cells]), flipped_policy, flipped_actions)
+
+        cells = SYM_PERMS[SYM_FLIPUD]
+        flipped_policy, flipped_actions = policy[flipUD_inv], valid_actions[flipUD_inv]
+        _append(_symmetric_state(workers_flat[cells], levels_flat[cells]), flipped_policy, flipped_actions)
+
+        if _PLACING_PHASE_POSSIBLE and self._next_placement() is not None:
             return symmetries
 
         def _swap_workers(array, half_size):
@@ -201,17 +221,11 @@ class Board:
             array_copy[:half_size], array_copy[half_size:] = array[half_size:], array[:half_size]
             return array_copy
 
-        w1, w2 = self._get_worker_position(1), self._get_worker_position(2)
-        self.workers[w1], self.workers[w2] = 2, 1
         swapped_policy = _swap_workers(policy, action_size() // 2)
         swapped_actions = _swap_workers(valid_actions, action_size() // 2)
-        symmetries.append((self.state.copy(), swapped_policy, swapped_actions))
-        self.state[:, :, :] = state_backup.copy()
+        _append(_symmetric_state(SWAP_MY_WORKERS[workers_flat + 2], levels_flat), swapped_policy, swapped_actions)
 
-        wm1, wm2 = self._get_worker_position(-1), self._get_worker_position(-2)
-        self.workers[wm1], self.workers[wm2] = -2, -1
-        symmetries.append((self.state.copy(), policy.copy(), valid_actions.copy()))
-        self.state[:, :, :] = state_backup.copy()
+        _append(_symmetric_state(SWAP_OTHER_WORKERS[workers_flat + 2], levels_flat), policy.copy(), valid_actions.copy())
 
         return symmetries
 
@@ -221,55 +235,196 @@ class Board:
     def copy_state(self, state, copy_or_not):
         if self.state is state and not copy_or_not:
             return
-        self.state = state.copy() if copy_or_not else state
+        if copy_or_not:
+            # Store the copy plane-major so that workers/levels/meta are each C-contiguous (5, 5)
+            # arrays; self.state remains a (5, 5, 3) view over them
+            self.state = np.array(state.transpose(2, 0, 1), order='C').transpose(1, 2, 0)
+        else:
+            self.state = state
         self.workers = self.state[:, :, 0]
         self.levels = self.state[:, :, 1]
         self.meta = self.state[:, :, 2]
 
-    def _next_placement(self):
-        if INIT_METHOD != 2:
+    def _next_placement(self, worker_cells=None):
+        if not _PLACING_PHASE_POSSIBLE:
             return None
-        if self._get_worker_position(1) == (-1, -1):
-            return (0, 1)
-        if self._get_worker_position(2) == (-1, -1):
-            return (0, 2)
-        if self._get_worker_position(-1) == (-1, -1):
-            return (1, -1)
-        if self._get_worker_position(-2) == (-1, -1):
-            return (1, -2)
+        if worker_cells is None:
+            worker_cells = _get_worker_cells(self.workers.ravel())
+        for worker_cell, placement in zip(worker_cells, PLACEMENT_ORDER):
+            if worker_cell < 0:
+                return placement
         return None
 
-    def _get_worker_position(self, searched_worker):
-        locations = np.argwhere(self.workers == searched_worker)
-        if locations.size == 0:
-            return (-1, -1)
-        return tuple(locations[0])
-
-    def _apply_direction(self, position, direction):
-        delta = DIRECTIONS[direction]
-        return (position[0] + delta[0], position[1] + delta[1])
-
-    def _able_to_move_worker_to(self, old_position, new_position, player):
-        if old_position == new_position:
-            return True
-        if not (0 <= new_position[0] < 5 and 0 <= new_position[1] < 5):
-            return False
-        if self.workers[new_position] != 0:
-            return False
-        new_level = self.levels[new_position]
-        if new_level > 3:
-            return False
-        old_level = self.levels[old_position]
-        if new_level > old_level + 1:
-            return False
-        return True
-
-    def _able_to_build(self, position, ignore=0):
-        if not (0 <= position[0] < 5 and 0 <= position[1] < 5):
-            return False
-        occupant = self.workers[position]
-        if occupant != 0 and occupant != ignore:
-            return False
-        if self.levels[position] >= 4:
-            return False
-        return True
+
+# The kernels below carry explicit signatures so that numba compiles them eagerly at import
+# (and caches the result) rather than stalling the first search on JIT compilation. Board
+# kernels also get a C-contiguous variant for the planes of boards that Board.copy_state copied.
+
+
+@njit('int64(int64)', cache=True, inline='always')
+def _worker_index(worker):
+    # Position of workers 1, 2, -1 and -2 in the arrays below; -1 for an empty cell, or for the
+    # out-of-range ids a board being edited may hold before its workers are renumbered
+    if 0 < worker <= 2:
+        return worker - 1
+    if -2 <= worker < 0:
+        return 1 - worker
+    return -1
+
+
+@njit('int64[::1](int8[::1])', cache=True)
+def _get_worker_cells(workers_flat):
+    # Flat cell of workers 1, 2, -1 and -2 (in that order) found in a single scan, -1 if not placed
+    cells = np.full(4, -1, dtype=np.int64)
+    for cell in range(25):
+        index = _worker_index(workers_flat[cell])
+        if index >= 0 and cells[index] < 0:
+            cells[index] = cell
+    return cells
+
+
+@njit(
+    [
+        'void(int8[:, ::1], int8[:, ::1], int64, int64, int64)',
+        'void(int8[:, :], int8[:, :], int64, int64, int64)',
+    ],
+    cache=True,
+)
+def _move_worker(workers, levels, cell, move_direction, build_direction):
+    # Cells come from NEIGHBORS as flat indices; planes are written in 2-D so strided ones work too
+    new_cell = NEIGHBORS[cell, move_direction]
+    workers[new_cell // 5, new_cell % 5] = workers[cell // 5, cell % 5]
+    workers[cell // 5, cell % 5] = 0
+    if build_direction != NO_BUILD:
+        build_cell = NEIGHBORS[new_cell, build_direction]
+        levels[build_cell // 5, build_cell % 5] = min(4, levels[build_cell // 5, build_cell % 5] + 1)
+
+
+@njit('Tuple((int64, int64[::1], int64[::1]))(int8[::1], int8[::1])', cache=True, inline='always')
+def _bitboards(workers_flat, levels_flat):
+    # Returns the occupied cells, for each level k in 0..3 the cells at level k or below, and
+    # the cells holding each worker id (ordered as in _get_worker_cells)
+    occupied = 0
+    at_most = np.zeros(4, dtype=np.int64)
+    own = np.zeros(4, dtype=np.int64)
+    for cell in range(25):
+        bit = 1 << cell
+        if workers_flat[cell] != 0:
+            occupied |= bit
+            index = _worker_index(workers_flat[cell])
+            if index >= 0:
+                own[index] |= bit
+        for level in range(levels_flat[cell], 4):
+            at_most[level] |= bit
+    return occupied, at_most, own
+
+
+@njit('UniTuple(int64, 2)(int64, int8[::1], int64, int64[::1], int64)', cache=True, inline='always')
+def _worker_masks(cell, levels_flat, occupied, at_most, own):
+    # Free, not domed, and at most one level higher than the current cell
+    destinations = NEIGHBOR_MASKS[cell] & ~occupied & at_most[min(levels_flat[cell] + 1, 3)]
+    # Once moved, the worker no longer blocks its former cell (nor, on an edited board, any
+    # other cell carrying the same id)
+    buildable = at_most[3] & (~occupied | own)
+    return destinations, buildable
+
+
+@njit(
+    [
+        'boolean[::1](int8[:, ::1], int8[:, ::1], int64)',
+        'boolean[::1](int8[:, :], int8[:, :], int64)',
+    ],
+    cache=True,
+)
+def _valid_moves(workers, levels, player):
+    workers_flat, levels_flat = workers.ravel(), levels.ravel()
+    occupied, at_most, own = _bitboards(workers_flat, levels_flat)
+    worker_cells = _get_worker_cells(workers_flat)
+    actions = np.zeros(NB_GODS * 2 * 9 * 9, dtype=np.bool_)
+    if _PLACING_PHASE_POSSIBLE and worker_cells.min() < 0:
+        # Still placing workers: action c places the next worker on free cell c
+        for cell in range(25):
+            actions[cell] = workers_flat[cell] == 0
+        return actions
+    for worker in range(2):
+        index = worker if player == 0 else 2 + worker
+        cell = worker_cells[index]
+        if cell < 0:
+            continue
+        destinations, buildable = _worker_masks(cell, levels_flat, occupied, at_most, own[index])
+        # NEIGHBOR_MASKS excludes the cell itself, so NO_MOVE / NO_BUILD are never set
+        for move_direction in range(9):
+            new_cell = NEIGHBORS[cell, move_direction]
+            if new_cell < 0 or not (destinations >> new_cell) & 1:
+                continue
+            builds = NEIGHBOR_MASKS[new_cell] & buildable
+            for build_direction in range(9):
+                build_cell = NEIGHBORS[new_cell, build_direction]
+                if build_cell < 0 or not (builds >> build_cell) & 1:
+                    continue
+                actions[_encode_action(worker, NO_GOD, move_direction, build_direction)] = True
+    return actions
+
+
+@njit('UniTuple(int64, 2)(int8[::1], int8[::1])', cache=True, inline='always')
+def _scores(workers_flat, levels_flat):
+    # Scored over every occupied cell like Board.get_score, which an edited board can make differ
+    # from scoring worker_cells only
+    score0, score1 = 0, 0
+    for cell in range(25):
+        if workers_flat[cell] > 0:
+            score0 = max(score0, int(levels_flat[cell]))
+        elif workers_flat[cell] < 0:
+            score1 = max(score1, int(levels_flat[cell]))
+    return score0, score1
+
+
+@njit(
+    [
+        'Tuple((int64, int64, boolean))(int8[:, ::1], int8[:, ::1], int64)',
+        'Tuple((int64, int64, boolean))(int8[:, :], int8[:, :], int64)',
+    ],
+    cache=True,
+)
+def _terminal_status(workers, levels, next_player):
+    # Returns (score0, score1, has_any_move) in one pass. Move generation stops at the first
+    # legal move, and is skipped entirely (has_any_move=True) once a player has won.
+    workers_flat, levels_flat = workers.ravel(), levels.ravel()
+    worker_cells = _get_worker_cells(workers_flat)
+    if _PLACING_PHASE_POSSIBLE and worker_cells.min() < 0:
+        # Still placing workers: the game cannot have ended yet
+        return 0, 0, True
+    score0, score1 = _scores(workers_flat, levels_flat)
+    if score0 == 3 or score1 == 3:
+        return score0, score1, True
+
+    occupied, at_most, own = _bitboards(workers_flat, levels_flat)
+    for worker in range(2):
+        index = worker if next_player == 0 else 2 + worker
+        cell = worker_cells[index]
+        if cell < 0:
+            continue
+        destinations, buildable = _worker_masks(cell, levels_flat, occupied, at_most, own[index])
+        for move_direction in range(9):
+            new_cell = NEIGHBORS[cell, move_direction]
+            if new_cell >= 0 and (destinations >> new_cell) & 1 and NEIGHBOR_MASKS[new_cell] & buildable:
+                return score0, score1, True
+    return score0, score1, False
+
+
+@njit(
+    [
+        'Tuple((int64, int64, boolean, boolean[::1]))(int8[:, ::1], int8[:, ::1], int64)',
+        'Tuple((int64, int64, boolean, boolean[::1]))(int8[:, :], int8[:, :], int64)',
+    ],
+    cache=True,
+)
+def _terminal_status_and_valid_moves(workers, levels, next_player):
+    # _terminal_status along with _valid_moves for the same player: when all the moves are
+    # needed anyway, whether any is legal comes for free
+    valid_actions = _valid_moves(workers, levels, next_player)
+    workers_flat = workers.ravel()
+    if _PLACING_PHASE_POSSIBLE and _get_worker_cells(workers_flat).min() < 0:
+        return 0, 0, True, valid_actions
+    score0, score1 = _scores(workers_flat, levels.ravel())
+    return score0, score1, valid_actions.any(), valid_actions
@@ -1,3 +1,7 @@
+from collections import deque
+from itertools import chain, islice
+from operator import is_
+
 from MCTS import MCTS
 from SantoriniGame import SantoriniGame as Game
 from SantoriniDisplay import move_to_str
@@ -16,18 +20,21 @@ __all__ = [
 ]
 
 g, board, mcts, player = None, None, None, 0
-history = [] # Previous states (new to old, not current). Each is an array with player and board and action
-future_history = [] # States that were undone (oldest first) for redo support
+history = deque() # Previous states (new to old, not current). Each is an array with player, board (packed by _pack_board), action, and the end/valids of that state when known (see _current_status)
+future_history = deque() # States that were undone (oldest first) for redo support
 current_eval = [0.0, 0.0] # Current evaluation values for [player0, player1]
 last_probs = None # Last computed policy vector for current position
+_last_status = None # (player, packed board, end, valids) of the last position passed to _current_status
+_last_export = None # (player, packed board, history entries, future entries, payload) of the last export_practice_state
+VERBOSE = False # Also print the AI's best moves to the console after each guessBestAction
 
 
 def _reset_state_for_setup(reset_board: bool = False):
     """Reset bookkeeping so a manual setup becomes the new baseline."""
     global history, future_history, player, current_eval, last_probs, board
 
-    history = []
-    future_history = []
+    history = deque()
+    future_history = deque()
     player = 0
     current_eval = [0.0, 0.0]
     last_probs = None
@@ -45,7 +52,7 @@ def _reset_state_for_setup(reset_board: bool = False):
         g.board.levels.fill(0)
         g.board.meta.fill(0)
 
-    board = np.copy(g.board.get_state())
+    board = g.board.get_state()
 
 
 def _normalize_coordinates(coord):
@@ -63,10 +70,11 @@ def _normalize_coordinates(coord):
 
 def _serialize_board_state(state):
     """Convert a numpy board state into a JSON-serializable list."""
-    array = np.array(state, copy=True)
+    # tolist() builds new Python objects, no need for a copy beforehand
+    array = np.asarray(state, dtype=np.int8)
     if array.shape != (5, 5, 3):
         raise ValueError(f"Unexpected board shape while serializing: {array.shape}")
-    return array.astype(np.int8).tolist()
+    return array.tolist()
 
 
 def _deserialize_board_state(payload):
@@ -77,12 +85,66 @@ def _deserialize_board_state(payload):
     return array
 
 
+def _pack_board(state):
+    """Return an immutable snapshot of a board state, as stored in history entries."""
+    # Plane by plane, the way Board stores its state, so that packing and unpacking are flat copies
+    return state.transpose(2, 0, 1).tobytes()
+
+
+def _unpack_board(packed):
+    """Return a writable board state from a _pack_board snapshot."""
+    return np.frombuffer(packed, dtype=np.int8).reshape(3, 5, 5).copy().transpose(1, 2, 0)
+
+
+def _current_status():
+    """Return the game end and valid moves of the current position.
+
+    They are recomputed only when the position differs from the last call or from the
+    history entry it was restored from.
+    """
+    global _last_status
+    packed = _pack_board(board)
+    if _last_status is not None and _last_status[0] == player and _last_status[1] == packed:
+        # g.board must still follow the current board: cells are read and edited through it
+        g.board.copy_state(board, False)
+    else:
+        end, valids = g.getGameEndedAndValidMoves(board, player)
+        _last_status = (player, packed, end, valids)
+    return _last_status[2], _last_status[3]
+
+
+def _history_entry(action):
+    """Return a history entry for the current position, keeping its status if known."""
+    packed = _pack_board(board)
+    if _last_status is not None and _last_status[0] == player and _last_status[1] == packed:
+        return [player, packed, action, _last_status[2], np.packbits(_last_status[3])]
+    return [player, packed, action, None, None]
+
+
+def _restore_status(entry):
+    """Return the status of a history entry just restored as the current position."""
+    global _last_status
+    if entry[3] is not None:
+        valids = np.unpackbits(entry[4], count=g.getActionSize()).view(np.bool_)
+        _last_status = (entry[0], entry[1], entry[3], valids)
+    return _current_status()
+
+
+def _same_entries(entries, other_entries):
+    return len(entries) == len(other_entries) and all(map(is_, entries, other_entries))
+
+
 def _serialize_history(entries):
     """Serialize history or future history entries for persistence."""
+    if not entries:
+        return []
+    # Convert all packed boards with a single tolist() call rather than one array per entry
+    packed = np.frombuffer(b"".join(entry[1] for entry in entries), dtype=np.int8)
+    board_states = packed.reshape(-1, 3, 5, 5).transpose(0, 2, 3, 1).tolist()
+
     serialized = []
-    for entry in entries:
+    for entry, board_state in zip(entries, board_states):
         player_value = int(entry[0])
-        board_state = _serialize_board_state(entry[1])
         action = entry[2]
         serialized.append(
             {
@@ -99,13 +161,18 @@ def _deserialize_history(entries):
     if entries is None:
         return []
 
+    entries = [entry for entry in entries if isinstance(entry, dict) and "board" in entry]
+    if not entries:
+        return []
+    # Convert all boards with a single array construction, then pack them plane by plane
+    board_states = np.array([entry["board"] for entry in entries], dtype=np.int8)
+    if board_states.shape[1:] != (5, 5, 3):
+        raise ValueError(f"Unexpected board shape while deserializing: {board_states.shape[1:]}")
+    planes = np.ascontiguousarray(board_states.transpose(0, 3, 1, 2))
+
     restored = []
-    for entry in entries:
-        if not isinstance(entry, dict):
-            continue
-        if "board" not in entry:
-            continue
-        board_state = _deserialize_board_state(entry["board"])
+    for entry, entry_planes in zip(entries, planes):
+        board_state = entry_planes.tobytes()
         player_value = int(entry.get("player", 0))
         action_value = entry.get("action")
         restored.append(
@@ -113,10 +180,25 @@ def _deserialize_history(entries):
                 player_value,
                 board_state,
                 None if action_value is None else int(action_value),
+                None,
+                None,
             ]
         )
     return restored
 
+
+def _top_actions(probs, k):
+    """Return up to k actions by decreasing probability, ties kept in action order."""
+    k = min(int(k), len(probs))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    # Every action at least as likely as the k-th best, in action order, then a stable sort
+    # of that short list gives the same order as sorting the whole policy
+    kth_prob = np.partition(probs, len(probs) - k)[len(probs) - k]
+    candidates = np.flatnonzero(probs >= kth_prob)
+    order = np.argsort(-probs[candidates], kind="stable")
+    return candidates[order[:k]]
+
 class dotdict(dict):
     def __getattr__(self, name):
         return self[name]
@@ -138,8 +220,8 @@ def init_game(numMCTSSims):
         board = g.getInitBoard()
         mcts = MCTS(g, None, mcts_args)
         player = 0
-        history = []
-        future_history = []
+        history = deque()
+        future_history = deque()
         valids = g.getValidMoves(board, player)
         end = [0,0]
 
@@ -147,11 +229,10 @@ def init_game(numMCTSSims):
 
 def getNextState(action):
         global g, board, mcts, player, history, future_history
-        future_history = []
-        history.insert(0, [player, np.copy(board), action])
+        future_history = deque()
+        history.appendleft(_history_entry(action))
         board, player = g.getNextState(board, player, action)
-        end = g.getGameEnded(board, player)
-        valids = g.getValidMoves(board, player)
+        end, valids = _current_status()
 
         return player, end, valids
 
@@ -192,14 +273,15 @@ def force_guided_setup(green1, green2, red1, red2):
         g.board.workers[y, x] = worker_id
 
     global board
-    board = np.copy(g.board.get_state())
+    board = g.board.get_state()
 
     return update_after_edit()
 
 
 def end_setup():
     """Finalize setup after edits and return new state."""
-    positions = [_findWorker(worker_id) for worker_id in (1, 2, -1, -2)]
+    found = _scan_workers()
+    positions = [found.get(worker_id, [-1, -1]) for worker_id in (1, 2, -1, -2)]
     if any(pos[0] < 0 or pos[1] < 0 for pos in positions):
         raise ValueError("All four workers must be placed before finalizing setup")
     return force_guided_setup(*positions)
@@ -210,10 +292,11 @@ async def guessBestAction():
     probs, q, _ = await mcts.getActionProb(
         g.getCanonicalForm(board, player), force_full_search=True
     )
-    g.board.copy_state(
-        board, True
-    )  # g.board was in canonical form, set it back to normal form
-    best_action = max(range(len(probs)), key=lambda x: probs[x])
+    # g.board was left on a search position: point it back to the current board. No copy is
+    # needed, g.board is only written to by editCell, which replaces board right after.
+    g.board.copy_state(board, False)
+    probs = np.asarray(probs, dtype=np.float64)
+    best_action = int(probs.argmax())
 
     # Store evaluation values (q is from current player's perspective)
     # Convert to Player 0's perspective
@@ -227,21 +310,23 @@ async def guessBestAction():
         f"AI Evaluation: Player 0: {current_eval[0]:+.3f}, Player 1: {current_eval[1]:+.3f} (current player: {player})"
     )
 
-    # Compute good moves
-    print("List of best moves found by AI:")
-    sorted_probs = sorted(
-        [(action, p) for action, p in enumerate(probs)],
-        key=lambda x: x[1],
-        reverse=True,
-    )
-    for i, (action, p) in enumerate(sorted_probs):
-        if p < sorted_probs[0][1] / 3.0 or i >= 3:
-            break
-        print(f"{int(100*p)}% [{action}] {move_to_str(action, player)}")
+    if VERBOSE:
+        _print_top_moves(probs, player)
 
     return best_action
 
 
+def _print_top_moves(probs, player):
+    """Print up to 3 of the best moves, skipping those 3x less likely than the best one."""
+    print("List of best moves found by AI:")
+    top_actions = _top_actions(probs, 3)
+    for action in top_actions:
+        p = probs[action]
+        if p < probs[top_actions[0]] / 3.0:
+            break
+        print(f"{int(100*p)}% [{action}] {move_to_str(int(action), player)}")
+
+
 def get_current_eval():
     global current_eval
     return current_eval
@@ -266,7 +351,8 @@ async def calculate_eval_for_current_position(numMCTSSims: int | None = None):
         # Get evaluation for current position
         canonical_board = g.getCanonicalForm(board, player)
         probs, q, _ = await mcts.getActionProb(canonical_board, force_full_search=True)
-        g.board.copy_state(board, True)  # Restore board state
+        g.board.copy_state(board, False)  # Restore board state
+        probs = np.asarray(probs, dtype=np.float64)
 
         # Store evaluation values (q is from current player's perspective)
         # Convert to Player 0's perspective
@@ -290,17 +376,14 @@ def list_current_moves(limit: int = 10):
     global g, board, mcts, player, last_probs
     if g is None or mcts is None or last_probs is None:
         return []
-    indexed = [(a, float(p)) for a, p in enumerate(last_probs)]
-    indexed.sort(key=lambda x: x[1], reverse=True)
     result = []
-    for action, p in indexed:
+    for action in _top_actions(last_probs, limit):
+        p = float(last_probs[action])
         if p <= 0.0:
-            continue
+            break
         result.append(
-            {"action": int(action), "prob": p, "text": move_to_str(action, player)}
+            {"action": int(action), "prob": p, "text": move_to_str(int(action), player)}
         )
-        if len(result) >= limit:
-            break
     return result
 
 
@@ -320,22 +403,19 @@ async def list_current_moves_with_adv(limit: int = 5, numMCTSSims: int | None =
         # Ensure we have a fresh policy for current state
         canonical_board = g.getCanonicalForm(board, player)
         probs, q, _ = await mcts.getActionProb(canonical_board, force_full_search=True)
-        g.board.copy_state(board, True)
+        probs = np.asarray(probs, dtype=np.float64)
         last_probs = probs
 
-        indexed = [(a, float(p)) for a, p in enumerate(probs)]
-        indexed.sort(key=lambda x: x[1], reverse=True)
-
         results = []
         checked = 0
-        for action, p in indexed:
+        for action in _top_actions(probs, limit):
+            action, p = int(action), float(probs[action])
             if p <= 0.0:
-                continue
+                break
             # Simulate the move on a copy, evaluate resulting position
             next_board, next_player = g.getNextState(board, player, action)
             next_canon = g.getCanonicalForm(next_board, next_player)
             _, q_after, _ = await mcts.getActionProb(next_canon, force_full_search=True)
-            g.board.copy_state(board, True)
 
             # Convert to Player 0 perspective
             if next_player == 0:
@@ -358,6 +438,9 @@ async def list_current_moves_with_adv(limit: int = 5, numMCTSSims: int | None =
                 break
         return results
     finally:
+        # g.getNextState copies board before playing on it, so g.board only needs to be
+        # pointed back once all candidate moves have been searched
+        g.board.copy_state(board, False)
         mcts.args.numMCTSSims = prev_sims
 
 
@@ -366,23 +449,22 @@ def _finalize_revert(removed_states):
     global g, board, player, history, future_history
 
     if not removed_states:
-        end = g.getGameEnded(board, player)
-        valids = g.getValidMoves(board, player)
+        end, valids = _current_status()
         return player, end, valids, []
 
     # The last element corresponds to the board state we are restoring
     target_state = removed_states[-1]
     player = int(target_state[0])
-    board = target_state[1]
+    board = _unpack_board(target_state[1])
 
     # Drop the reverted states from the history and prepend them to the redo stack
-    history = history[len(removed_states) :]
-    future_history = removed_states[::-1] + future_history
+    for _ in removed_states:
+        history.popleft()
+    future_history.extendleft(removed_states)
 
     removed_actions = [int(state[2]) for state in removed_states]
 
-    end = g.getGameEnded(board, player)
-    valids = g.getValidMoves(board, player)
+    end, valids = _restore_status(target_state)
     return player, end, valids, removed_actions
 
 
@@ -393,7 +475,7 @@ def revert_last_move():
     if len(history) == 0:
         return _finalize_revert([])
 
-    removed_states = history[:1]
+    removed_states = [history[0]]
     return _finalize_revert(removed_states)
 
 
@@ -406,12 +488,15 @@ def revert_to_previous_move(player_asking_revert):
 
         if len(history) > 0:
                 if player_asking_revert is None:
-                        removed_states = history[:1]
+                        removed_states = [history[0]]
                 else:
-                        # Revert to the previous 0 before a 1, or first 0 from game
-                        for index, state in enumerate(history):
-                                if (state[0] == player_asking_revert) and (index+1 == len(history) or history[index+1][0] != player_asking_revert):
-                                        removed_states = history[:index+1]
+                        # Revert to the previous 0 before a 1, or first 0 from game. Each state is paired
+                        # with the player of the one before it (None past the first move), as indexing
+                        # into the history deque is not constant time.
+                        previous_players = chain(islice((state[0] for state in history), 1, None), [None])
+                        for index, (state, previous_player) in enumerate(zip(history, previous_players)):
+                                if (state[0] == player_asking_revert) and (previous_player != player_asking_revert):
+                                        removed_states = list(islice(history, index+1))
                                         break
                         if removed_states:
                                 print(f'index={len(removed_states)-1} / {len(history)}');
@@ -427,18 +512,17 @@ def jump_to_move_index(move_index):
 
         # Get the state at the specified index
         state = history[move_index]
-        player, board = state[0], state[1]
+        player, board = state[0], _unpack_board(state[1])
 
         # Clear redo information when jumping arbitrarily in history
-        future_history = []
+        future_history = deque()
 
         # Don't truncate history - just set the current state
         # This allows the modal to remain populated
 
         print(f'Jumped to move {move_index}: player={player}')
 
-        end = g.getGameEnded(board, player)
-        valids = g.getValidMoves(board, player)
+        end, valids = _restore_status(state)
         return player, end, valids
 
 def redo_next_move():
@@ -446,25 +530,22 @@ def redo_next_move():
     global g, board, mcts, player, history, future_history
 
     if len(future_history) == 0:
-        end = g.getGameEnded(board, player)
-        valids = g.getValidMoves(board, player)
+        end, valids = _current_status()
         return player, end, valids
 
-    next_state = future_history.pop(0)
+    next_state = future_history.popleft()
     state_player = int(next_state[0])
-    state_board = np.copy(next_state[1])
     action = int(next_state[2])
 
     # Restore to the state before the move
     player = state_player
-    board = state_board
+    board = _unpack_board(next_state[1])
 
     # Record this state in the history again before applying the move
-    history.insert(0, [player, np.copy(board), action])
+    history.appendleft(next_state)
 
     board, player = g.getNextState(board, player, action)
-    end = g.getGameEnded(board, player)
-    valids = g.getValidMoves(board, player)
+    end, valids = _current_status()
 
     return player, end, valids, action, len(future_history)
 
@@ -530,22 +611,36 @@ def export_practice_state():
     if g is None:
         return None
 
-    try:
-        current_board = _serialize_board_state(board)
-        history_payload = _serialize_history(history)
-        future_payload = _serialize_history(future_history)
-        end_state = g.getGameEnded(board, player)
-        valid_moves = g.getValidMoves(board, player)
+    global _last_export
 
-        return {
+    try:
+        end_state, valid_moves = _current_status()
+
+        # History entries are never modified once recorded, so the state is unchanged since the
+        # last export if the same entries are still there (held by _last_export, so their ids
+        # cannot have been reused)
+        packed = _pack_board(board)
+        history_entries, future_entries = tuple(history), tuple(future_history)
+        if (
+            _last_export is not None
+            and _last_export[0] == player
+            and _last_export[1] == packed
+            and _same_entries(_last_export[2], history_entries)
+            and _same_entries(_last_export[3], future_entries)
+        ):
+            return _last_export[4]
+
+        payload = {
             "version": 1,
             "player": int(player),
-            "board": current_board,
-            "history": history_payload,
-            "future": future_payload,
+            "board": _serialize_board_state(board),
+            "history": _serialize_history(history_entries),
+            "future": _serialize_history(future_entries),
             "gameEnded": [int(end_state[0]), int(end_state[1])],
             "validMoves": [bool(x) for x in valid_moves.tolist()],
         }
+        _last_export = (player, packed, history_entries, future_entries, payload)
+        return payload
     except Exception as exc:  # pragma: no cover - defensive guard
         print(f"Failed to export practice state: {exc}")
         return None
@@ -578,15 +673,14 @@ def import_practice_state(payload):
         raise ValueError("Malformed practice state data") from exc
 
     g.board.state[:, :, :] = restored_board
-    board = np.copy(g.board.get_state())
+    board = g.board.get_state()
     player = player_value
-    history = history_entries
-    future_history = future_entries
+    history = deque(history_entries)
+    future_history = deque(future_entries)
     current_eval = [0.0, 0.0]
     last_probs = None
 
-    end_state = g.getGameEnded(board, player)
-    valid_moves = g.getValidMoves(board, player)
+    end_state, valid_moves = _current_status()
 
     return [int(player), end_state, valid_moves]
 
@@ -603,47 +697,56 @@ def _findWorker(worker):
     return [lookup_result[0][0].item(), lookup_result[1][0].item()]
 
 
+def _scan_workers():
+    """Map each worker id on the board to its [y, x], as _findWorker would, in a single scan."""
+    workers = g.board.workers
+    found = {}
+    for y, x in zip(*workers.nonzero()):
+        # setdefault keeps the first cell in row-major order if an edit left duplicate ids
+        found.setdefault(workers[y, x].item(), [y.item(), x.item()])
+    return found
+
+
 def _read_worker(y, x):
-    return g.board.workers[y][x].item()
+    return g.board.workers.item(y, x)
 
 
 def _read_level(y, x):
-    return g.board.levels[y][x].item()
+    return g.board.levels.item(y, x)
 
 
 def editCell(clicked_y, clicked_x, editMode):
     global board
     if editMode == 1:
-        g.board.levels[clicked_y, clicked_x] = (
-            g.board.levels[clicked_y, clicked_x] + 1
-        ) % 5
+        level = int(g.board.levels[clicked_y, clicked_x])
+        g.board.levels[clicked_y, clicked_x] = (level + 1) % 5
     elif editMode == 2:
-        if g.board.workers[clicked_y, clicked_x] > 0:
+        # Cycle empty -> player 0 -> player 1 -> empty, reading the cell once
+        worker = int(g.board.workers[clicked_y, clicked_x])
+        if worker > 0:
             g.board.workers[clicked_y, clicked_x] = -1
-        elif g.board.workers[clicked_y, clicked_x] < 0:
+        elif worker < 0:
             g.board.workers[clicked_y, clicked_x] = 0
         else:
             g.board.workers[clicked_y, clicked_x] = 1
     elif editMode == 0:
-        # Reassign worker ID
-        counts = [0, 0]
-        for xy in range(25):
-            if g.board.workers.flat[xy] > 0:
-                counts[0] += 1
-                g.board.workers.flat[xy] = counts[0]
-            elif g.board.workers.flat[xy] < 0:
-                counts[1] += 1
-                g.board.workers.flat[xy] = -counts[1]
+        # Reassign worker ID, numbering each player's workers in row-major order
+        workers = g.board.workers
+        mine, theirs = workers > 0, workers < 0
+        counts = [int(mine.sum()), int(theirs.sum())]
+        workers[mine] = np.arange(1, counts[0] + 1)
+        workers[theirs] = -np.arange(1, counts[1] + 1)
         if counts[0] != 2 or counts[1] != 2:
             print("Invalid board", counts)
     else:
         print("Dont know what to do in editMode", editMode)
 
-    # Keep the exported board state in sync with edits applied to g.board
-    board = np.copy(g.board.get_state())
+    # Keep the exported board state in sync with edits applied to g.board. Sharing the array
+    # is enough, as in init_game: g.getNextState and the search copy before writing, so the
+    # only writes through g.board are edits of the current board.
+    board = g.board.get_state()
 
 
 def update_after_edit():
-    end = g.getGameEnded(board, player)
-    valids = g.getValidMoves(board, player)
+    end, valids = _current_status()
     return player, end, valids